@@ -0,0 +1,174 @@
+"""
+Manifest helpers shared by the bin/ scripts: single-pass sha256 + row counting,
+the (size, mtime_ns) hash cache, and manifest.json / manifest.sha256 output.
+"""
+import os, json, hashlib, time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson  # optional: faster JSON serialization
+except ImportError:
+    orjson = None
+
+CACHE_FILENAME = ".cache.json"   # manifest/<this>: per-file stat → sha256/rows
+HEADER_MAX     = 64 * 1024       # longest first line kept as a file's header
+
+# --------------------------
+# Hashing / counting
+# --------------------------
+def new_sha256():
+    # Integrity check, not a security boundary: usedforsecurity=False (3.9+) only matters
+    # on FIPS-mode builds, where it keeps SHA-256 usable; speed is the same either way.
+    try:
+        return hashlib.new("sha256", usedforsecurity=False)
+    except TypeError:
+        return hashlib.new("sha256")
+
+def hash_and_count(path, chunk_size=1024*1024):
+    """
+    Single pass over the bytes: (sha256 hexdigest, data rows excluding header,
+    first line decoded as text) so callers needn't reopen the file for its header.
+    The header is None when no newline occurs within HEADER_MAX bytes.
+    """
+    h = new_sha256()
+    newlines = 0
+    last = b''
+    head, head_done = b'', False
+    # one reusable buffer: hash, count and header search all work on it in place,
+    # so there is no bytes object per chunk
+    buf = bytearray(chunk_size)
+    mv = memoryview(buf)
+    with open(path, 'rb', buffering=0) as fh:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while (n := fh.readinto(buf)):
+            h.update(mv[:n])
+            newlines += buf.count(b'\n', 0, n)
+            last = buf[n - 1:n]
+            if head is not None and not head_done:
+                end = buf.find(b'\n', 0, n)
+                head += bytes(mv[:n] if end < 0 else mv[:end])
+                head_done = end >= 0
+                if len(head) > HEADER_MAX:
+                    head = None
+    if not head_done:
+        head = None
+    # an unterminated final line still counts
+    lines = newlines + (1 if last and last != b'\n' else 0)
+    header = head.rstrip(b'\r').decode("utf-8", errors="replace") if head is not None else None
+    return h.hexdigest(), max(0, lines - 1), header  # rows exclude header
+
+def prefetch(paths):
+    """
+    Ask the kernel to start readahead on every file at once (POSIX_FADV_WILLNEED),
+    so disk reads for later files overlap hashing of earlier ones. No-op where
+    posix_fadvise is unavailable (macOS, Windows).
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+def dumps(obj, sort_keys=False):
+    """JSON-encode to UTF-8 bytes with 2-space indent; same bytes with or without orjson."""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2, sort_keys=sort_keys, ensure_ascii=False).encode("utf-8")
+
+def write_atomic(path, data):
+    """Write bytes to a sibling temp file, fsync, then os.replace() over path."""
+    tmp = path + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+def load_hash_cache(mani_dir):
+    try:
+        with open(os.path.join(mani_dir, CACHE_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_hash_cache(mani_dir, cache):
+    path = os.path.join(mani_dir, CACHE_FILENAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def ensure_dirs(base):
+    os.makedirs(os.path.join(base, "manifest"), exist_ok=True)
+    os.makedirs(os.path.join(base, "mappings"), exist_ok=True)
+    os.makedirs(os.path.join(base, "src"), exist_ok=True)
+
+# --------------------------
+# Manifest (preserve exact behavior)
+# --------------------------
+def build_manifest(base, dataset, version, use_cache=True):
+    """
+    Write manifest.json + manifest.sha256; returns {filename: raw header line}.
+    use_cache=False re-hashes every file instead of trusting CACHE_FILENAME.
+    """
+    src_dir  = os.path.join(base, "src")
+    mani_dir = os.path.join(base, "manifest")
+    ensure_dirs(base)
+
+    with os.scandir(src_dir) as it:
+        dir_entries = sorted((e for e in it if e.name.endswith(".csv") and e.is_file()), key=lambda e: e.name)
+    files = [e.name for e in dir_entries]
+
+    # reuse sha256/rows/header for files whose (size, mtime_ns) is unchanged since the last run
+    old_cache = load_hash_cache(mani_dir) if use_cache else {}
+    cache = {}
+    stale = []
+    for e in dir_entries:
+        f, st = e.name, e.stat()
+        hit = old_cache.get(f)
+        if (hit and hit.get("size") == st.st_size and hit.get("mtime_ns") == st.st_mtime_ns
+                and "header" in hit and len(hit["header"] or "") <= HEADER_MAX):
+            cache[f] = hit
+        else:
+            cache[f] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            stale.append(e)
+
+    paths = [e.path for e in stale]
+    prefetch(paths)
+    # hashlib releases the GIL on large updates, so files hash concurrently;
+    # ex.map keeps results in the sorted file order
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(stale)))) as ex:
+        results = list(ex.map(hash_and_count, paths))
+    for e, (digest, rows, header) in zip(stale, results):
+        cache[e.name].update({"sha256": digest, "rows": rows, "header": header})
+    save_hash_cache(mani_dir, cache)
+    if files:
+        print(f"• Hashed {len(stale)} CSV(s); reused {len(files) - len(stale)} unchanged from {CACHE_FILENAME}")
+
+    entries = []
+    for f in files:
+        entries.append({"name": f, "sha256": cache[f]["sha256"], "rows": cache[f]["rows"], "format": "csv"})
+
+    manifest = {
+        "dataset": dataset,
+        "version": version,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime()),
+        "files": entries
+    }
+
+    mjson = dumps(manifest, sort_keys=True)
+    write_atomic(os.path.join(mani_dir, "manifest.json"), mjson)
+    write_atomic(os.path.join(mani_dir, "manifest.sha256"),
+                 (hashlib.sha256(mjson).hexdigest() + " manifest.json\n").encode("utf-8"))
+
+    print(f"✓ Wrote {os.path.join(mani_dir, 'manifest.json')} and manifest.sha256")
+    return {f: cache[f]["header"] for f in files if cache[f]["header"] is not None}
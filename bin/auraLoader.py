@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 import argparse
+import csv
 import json
 import os
+import re
 import sys
 import time
 import hashlib
-from urllib.parse import urljoin
+import io
+import itertools
+import threading
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urljoin, urlparse
+from urllib.request import url2pathname
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
     import requests
@@ -17,10 +25,21 @@ except ImportError:
 
 try:
     from neo4j import GraphDatabase
+    from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
 except ImportError:
     print("Missing dependency: neo4j. Install with `pip install neo4j`.", file=sys.stderr)
     sys.exit(1)
 
+try:
+    import orjson  # optional: faster JSON parsing
+except ImportError:
+    orjson = None
+
+try:
+    import pandas as pd  # optional: vectorized column scan in preflight
+except ImportError:
+    pd = None
+
 
 @dataclass
 class SourceFile:
@@ -30,6 +49,9 @@ class SourceFile:
     rows: Optional[int] = None
 
 def read_json(path: str) -> Dict[str, Any]:
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
@@ -41,58 +63,348 @@ def to_url(base_url: str, path: str) -> str:
         return path
     return urljoin(base_url.rstrip('/') + '/', os.path.basename(path))
 
+def local_path_of(url: str) -> Optional[str]:
+    """Filesystem path for a file:// URI or plain path; None for HTTP(S) URLs."""
+    if is_url(url):
+        return None
+    if url.startswith("file://"):
+        return url2pathname(urlparse(url).path)
+    return url
+
+# Set to make every open stream raise at its next chunk, so a failed preflight
+# doesn't sit waiting on the other workers' downloads before exiting.
+abort_streams = threading.Event()
+
+def _abortable(chunks):
+    for chunk in chunks:
+        if abort_streams.is_set():
+            raise RuntimeError("stream aborted")
+        yield chunk
+
+@contextmanager
+def open_binary_stream(url: str, chunk_size: int = 1024 * 1024):
+    """
+    Yield an iterator of raw byte chunks for an HTTP(S) URL, a file:// URI or a
+    local path. Local files are read directly instead of going through requests.
+    """
+    path = local_path_of(url)
+    if path is not None:
+        with open(path, "rb") as f:
+            yield _abortable(iter(lambda: f.read(chunk_size), b""))
+    else:
+        with requests.get(url, stream=True, timeout=60) as r:
+            r.raise_for_status()
+            yield _abortable(r.iter_content(chunk_size=chunk_size))
+
 def sha256_of_url(url: str, chunk_size: int = 1024 * 1024) -> str:
-    with requests.get(url, stream=True, timeout=60) as r:
-        r.raise_for_status()
-        h = hashlib.sha256()
-        for chunk in r.iter_content(chunk_size=chunk_size):
+    # Python 3.11+: C-level read/update loop for local files. Downloads stay on the
+    # chunk loop: they are network-bound, and it lets abort_streams interrupt them.
+    path = local_path_of(url)
+    if path is not None and hasattr(hashlib, "file_digest"):
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    h = hashlib.sha256()
+    with open_binary_stream(url, chunk_size) as chunks:
+        for chunk in chunks:
             if chunk:
                 h.update(chunk)
-        return h.hexdigest()
+    return h.hexdigest()
 
-def count_rows_of_url(url: str) -> int:
-    with requests.get(url, stream=True, timeout=60) as r:
-        r.raise_for_status()
-        lines = 0
-        for _ in r.iter_lines(decode_unicode=True):
-            lines += 1
-    return max(0, lines - 1)
+# ---------- Local checksum cache (skip re-hashing unchanged remote files) ----------
+CHECKSUM_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "auraloader", "checksums.json")
+_checksum_cache_lock = threading.Lock()
 
-# ---------- CSV preflight for missing column values ----------
-def count_missing_col_in_csv(url: str, col: str) -> int:
-    import csv, io, requests
-    with requests.get(url, stream=True, timeout=60) as r:
-        r.raise_for_status()
-        data = "".join(chunk.decode("utf-8", errors="replace") for chunk in r.iter_content(65536))
-    bom = "\ufeff"
-    lines = data.splitlines()
-    if not lines:
-        return 0
-    lines[0] = lines[0].lstrip(bom)
-    buf = io.StringIO("\n".join(lines))
-    reader = csv.DictReader(buf)
+def _load_checksum_cache() -> Dict[str, Any]:
+    try:
+        with open(CHECKSUM_CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def remote_validators(url: str) -> Optional[Dict[str, Optional[str]]]:
+    """
+    HEAD the URL and return its ETag / Last-Modified / Content-Length.
+    None if the server offers neither ETag nor Last-Modified (nothing safe to key on),
+    or if `url` is local.
+    """
+    if not is_url(url):
+        return None
+    r = requests.head(url, timeout=30, allow_redirects=True)
+    r.raise_for_status()
+    v = {k: r.headers.get(k) for k in ("ETag", "Last-Modified", "Content-Length")}
+    return v if (v["ETag"] or v["Last-Modified"]) else None
+
+def lookup_cached_sha256(url: str, validators: Optional[Dict[str, Optional[str]]]) -> Optional[str]:
+    if not validators:
+        return None
+    with _checksum_cache_lock:
+        entry = _load_checksum_cache().get(hashlib.sha256(url.encode()).hexdigest())
+    if entry and entry.get("validators") == validators:
+        return entry.get("sha256")
+    return None
+
+def store_cached_sha256(url: str, validators: Optional[Dict[str, Optional[str]]], sha: str) -> None:
+    if not validators:
+        return
+    with _checksum_cache_lock:
+        cache = _load_checksum_cache()
+        cache[hashlib.sha256(url.encode()).hexdigest()] = {"url": url, "validators": validators, "sha256": sha}
+        os.makedirs(os.path.dirname(CHECKSUM_CACHE_PATH), exist_ok=True)
+        tmp = f"{CHECKSUM_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        os.replace(tmp, CHECKSUM_CACHE_PATH)
+
+# ---------- Fused streaming preflight (one download per source) ----------
+def _iter_text_lines(chunks):
+    """
+    Split a stream of byte chunks into decoded text lines (newline kept),
+    holding at most one partial line in memory. A UTF-8 BOM is stripped
+    from the first line only.
+    """
+    pending = b""
+    first = True
+    for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            text = line.decode("utf-8", errors="replace") + "\n"
+            if first:
+                text, first = text.lstrip("\ufeff"), False
+            yield text
+    if pending:
+        text = pending.decode("utf-8", errors="replace")
+        yield text.lstrip("\ufeff") if first else text
+
+def _count_missing_col(lines, col: str) -> int:
     n = 0
-    for row in reader:
-        v = (row.get(col) or "").strip().lstrip(bom)
-        if v == "" or v == r"\N":
+    for row in csv.DictReader(lines):
+        if (row.get(col) or "").strip().lstrip("\ufeff") in ("", r"\N"):
             n += 1
     return n
 
+class _ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks (no copying into one buffer)."""
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._view = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._view:
+            try:
+                self._view = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._view))
+        b[:n] = self._view[:n]
+        self._view = self._view[n:]
+        return n
+
+def _count_missing_col_pandas(chunks, col: str) -> int:
+    """Same result as _count_missing_col, using pandas' C parser in 1M-row batches."""
+    chunks = iter(chunks)
+    first = next(chunks, b"")
+    header_line = first.split(b"\n", 1)[0].decode("utf-8-sig", errors="replace")
+    header = next(csv.reader([header_line]), [])
+    chunks = itertools.chain([first], chunks)
+    if header.count(col) != 1:
+        # absent (every row counts as missing) or duplicated (DictReader keeps the last
+        # one, pandas the first): let the pure-Python path count them
+        return _count_missing_col(_iter_text_lines(chunks), col)
+    # exact header match, as DictReader does; index_col=False stops pandas from turning
+    # the first column into the index when a row has more fields than the header
+    reader = pd.read_csv(
+        io.BufferedReader(_ChunkReader(chunks), 1 << 20),
+        encoding="utf-8-sig", encoding_errors="replace",
+        usecols=[col], index_col=False, dtype="string",
+        na_values=["", "\\N"], keep_default_na=False,
+        engine="c", chunksize=1_000_000,
+    )
+    n = 0
+    for frame in reader:
+        v = frame[col]
+        n += int((v.isna() | v.str.strip().str.lstrip("\ufeff").isin(["", "\\N"])).sum())
+    return n
+
+def preflight_stream(url: str, need_sha: bool, need_rows: bool, need_col: Optional[str] = None):
+    """
+    Single read over `url` (HTTP(S), file:// or local path) computing any of: sha256, row count (lines - header),
+    and the number of rows whose `need_col` value is empty or '\\N'.
+    Returns (sha_hex, rows, missing_count); disabled checks come back as None.
+    """
+    if need_sha and not need_rows and not need_col:
+        return sha256_of_url(url), None, None
+    h = hashlib.sha256() if need_sha else None
+    newlines = 0
+    last = b""
+    missing = None
+    with open_binary_stream(url) as stream:
+
+        def tap():
+            nonlocal newlines, last
+            for chunk in stream:
+                if not chunk:
+                    continue
+                if h is not None:
+                    h.update(chunk)
+                if need_rows:
+                    newlines += chunk.count(b"\n")
+                    last = chunk[-1:]
+                yield chunk
+
+        chunks = tap()
+        if need_col and pd is not None:
+            missing = _count_missing_col_pandas(chunks, need_col)
+        elif need_col:
+            missing = _count_missing_col(_iter_text_lines(chunks), need_col)
+        for _ in chunks:
+            pass
+    sha = h.hexdigest() if h is not None else None
+    # an unterminated final line still counts as a row
+    lines = newlines + (1 if last and last != b"\n" else 0)
+    rows = max(0, lines - 1) if need_rows else None
+    return sha, rows, missing
+
+def count_rows_of_url(url: str) -> int:
+    return preflight_stream(url, need_sha=False, need_rows=True)[1]
+
+# ---------- CSV preflight for missing column values ----------
+def count_missing_col_in_csv(url: str, col: str) -> int:
+    return preflight_stream(url, need_sha=False, need_rows=False, need_col=col)[2]
+
+# ---------- Client-side CSV sanitizing (lets the loader emit minimal Cypher) ----------
+# MySQL Shell csv-unix exports: every value quoted with \" escapes, NULL as a bare \N.
+_QUOTED_FIELD = r'"(?:[^"\\]|\\.)*"'
+_CSV_RECORD = re.compile(rf'(?:{_QUOTED_FIELD}|[^",\n]*)(?:,(?:{_QUOTED_FIELD}|[^",\n]*))*\r?\n?')
+_BARE_NULL = re.compile(rf'({_QUOTED_FIELD})|(?<![^,\n])\\N(?![^,\r\n])')
+
+def sanitize_csv(url: str, out_dir: str) -> str:
+    """
+    Stream `url` (HTTP(S), file:// or local path) into out_dir/<basename> with the
+    header BOM removed and every unquoted '\\N' field blanked. Everything else is
+    copied verbatim, so quoted fields keep their \\" escapes. Empty unquoted fields
+    are read as NULL by LOAD CSV, so the result loads correctly with --sanitized.
+    Returns the written path.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    dest = os.path.join(out_dir, os.path.basename(urlparse(url).path or url))
+    tmp = dest + ".tmp"
+    with open_binary_stream(url) as chunks, open(tmp, "w", encoding="utf-8", newline="") as out:
+        record = ""
+        for line in _iter_text_lines(chunks):
+            record += line
+            if not _CSV_RECORD.fullmatch(record):
+                continue  # newline inside a quoted field; the record goes on
+            out.write(_BARE_NULL.sub(r"\1", record))
+            record = ""
+        out.write(_BARE_NULL.sub(r"\1", record))
+    os.replace(tmp, dest)
+    return dest
+
+# ---------- Per-source preflight (runs in a worker thread) ----------
+def _preflight_one(src, url: str, flags: Dict[str, bool]) -> Dict[str, Any]:
+    """
+    Run the enabled preflight checks for a single source.
+    Only computes values; comparison and reporting happen in main().
+    """
+    res = {"name": src["name"], "url": url, "sha": None, "sha_cached": False, "rows": None,
+           "missing_linkid": None, "error": None}
+    need_sha = bool(flags["verify_checksums"] and src.get("checksum_sha256"))
+    need_rows = bool(flags["verify_rowcounts"] and src.get("rows") is not None)
+    need_col = "linkid" if src["name"] == "semlinkref" else None
+    validators = None
+    if need_sha and flags["checksum_cache"]:
+        try:
+            validators = remote_validators(url)
+        except requests.RequestException:
+            validators = None
+        cached = lookup_cached_sha256(url, validators)
+        if cached is not None:
+            res["sha"], res["sha_cached"] = cached, True
+            need_sha = False
+    if not (need_sha or need_rows or need_col):
+        return res
+    try:
+        sha, res["rows"], res["missing_linkid"] = preflight_stream(url, need_sha, need_rows, need_col)
+    except Exception as e:
+        if not need_col or abort_streams.is_set():
+            raise
+        # the linkid scan is advisory; redo the mandatory checks without it
+        res["error"] = e
+        sha = None
+        if need_sha or need_rows:
+            sha, res["rows"], _ = preflight_stream(url, need_sha, need_rows)
+    if need_sha:
+        res["sha"] = sha
+        store_cached_sha256(url, validators, sha)
+    return res
+
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+def retry_transient(fn, attempts: int = 5, base_delay: float = 1.0):
+    """
+    Retry `fn` on transient driver errors (deadlocks between concurrent loads,
+    Aura failovers) with exponential backoff.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except RETRYABLE_ERRORS as e:
+            if attempt == attempts - 1:
+                raise
+            delay = base_delay * (2 ** attempt)
+            print(f"  transient error ({getattr(e, 'code', None) or type(e).__name__}); "
+                  f"retrying in {delay:.0f}s", file=sys.stderr)
+            time.sleep(delay)
+
 class Neo:
-    def __init__(self, uri: str, user: str, password: str):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password), max_connection_lifetime=3600)
+    def __init__(self, uri: str, user: str, password: str, pool_size: int = 64,
+                 conn_timeout: float = 30.0, database: str = "neo4j"):
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_lifetime=3600,
+            max_connection_pool_size=pool_size,
+            connection_acquisition_timeout=120,
+            connection_timeout=conn_timeout,
+            keep_alive=True,
+        )
+        # naming the database up front saves a home-database lookup per session
+        self.database = database
+
+    def session(self):
+        return self.driver.session(database=self.database)
 
     def close(self):
         self.driver.close()
 
     def run(self, cypher: str, params: Dict[str, Any] = None):
         params = params or {}
-        with self.driver.session() as session:
-            res = session.run(cypher, params)
-            return [r.data() for r in res]
+        with self.session() as session:
+            return list(session.run(cypher, params))
+
+    def run_many(self, stmts: List[str], params: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Run statements back-to-back on one session, each in its own managed write transaction."""
+        params = params or [{}] * len(stmts)
+        with self.session() as session:
+            for cypher, p in zip(stmts, params):
+                session.execute_write(lambda tx: tx.run(cypher, p).consume())
+
+    def run_load(self, cypher: str, params: Dict[str, Any] = None) -> None:
+        """
+        Auto-commit run for CALL { } IN TRANSACTIONS (which cannot live inside a
+        managed transaction), retried with backoff. Safe because loads are MERGEs.
+        """
+        params = params or {}
+
+        def once():
+            with self.session() as session:
+                session.run(cypher, params).consume()
 
-    def run_void(self, cypher: str, params: Dict[str, Any] = None) -> None:
-        _ = self.run(cypher, params)
+        retry_transient(once)
 
 
 def build_constraint_cypher(runtime_indexes):
@@ -112,14 +424,18 @@ def build_constraint_cypher(runtime_indexes):
             stmts.append(f"CREATE INDEX IF NOT EXISTS FOR ()-[r:`{rtype}`]-() ON (r.`{props[0]}`);")
     return stmts
 
-def type_cast(expr: str, spec):
+def type_cast(expr: str, spec, sanitized: bool = False):
     t = spec.get("type", "string")
     transforms = spec.get("transform", [])
-    # strip BOM + trim
-    e = f"replace({expr}, '\\uFEFF', '')"
-    e = f"trim({e})"
-    # treat '\N' as empty (NULL later)
-    e = f"CASE WHEN {e} = '\\\\N' THEN '' ELSE {e} END"
+    if sanitized:
+        # CSV was pre-cleaned (no BOM, no '\N'): trim only
+        e = f"trim({expr})"
+    else:
+        # strip BOM + trim
+        e = f"replace({expr}, '\\uFEFF', '')"
+        e = f"trim({e})"
+        # treat '\N' as empty (NULL later)
+        e = f"CASE WHEN {e} = '\\\\N' THEN '' ELSE {e} END"
     if "lower" in transforms:
         e = f"toLower({e})"
     if t == "int":
@@ -128,35 +444,46 @@ def type_cast(expr: str, spec):
         e = f"toFloat({e})"
     return e
 
-def nullable_cast(expr: str, spec):
-    base = type_cast(expr, spec)
-    null_check = f"{expr} IS NULL OR {expr} = '' OR {expr} = '\\\\N'"
+def nullable_cast(expr: str, spec, sanitized: bool = False):
+    base = type_cast(expr, spec, sanitized)
+    if sanitized:
+        null_check = f"{expr} IS NULL OR {expr} = ''"
+    else:
+        null_check = f"{expr} IS NULL OR {expr} = '' OR {expr} = '\\\\N'"
     return f"CASE WHEN {null_check} THEN NULL ELSE {base} END" if spec.get("nullable", False) else base
 
+def present_pred(col: str, sanitized: bool = False) -> str:
+    """Cypher predicate: row.`col` holds a non-empty, non-'\\N' value."""
+    if sanitized:
+        return f"trim(row.`{col}`) <> ''"
+    return (f"(CASE WHEN replace(trim(row.`{col}`), '\\uFEFF','') = '\\\\N' "
+            f"THEN '' ELSE replace(trim(row.`{col}`), '\\uFEFF','') END) <> ''")
+
+def int_col(col: str, sanitized: bool = False) -> str:
+    if sanitized:
+        return f"toInteger(trim(row.`{col}`))"
+    return f"toInteger(replace(trim(row.`{col}`), '\\uFEFF',''))"
+
 # ---------- BUILDERS RETURN ONLY THE BODY (starting with WITH row ...) ----------
-def build_node_load_body(node_spec) -> str:
+def build_node_load_body(node_spec, sanitized: bool = False) -> str:
     label = node_spec["label"]
     mappings = node_spec["mappings"]
     key_fields = node_spec["key"]
     key_cols = [mappings[k]["column"] for k in key_fields]
 
     merge_on = ", ".join(
-        f"{k}: {type_cast('row.' + mappings[k]['column'], mappings[k])}"
+        f"{k}: {type_cast('row.' + mappings[k]['column'], mappings[k], sanitized)}"
         for k in key_fields
     )
 
-    key_preds = " AND ".join(
-        f"(CASE WHEN replace(trim(row.`{col}`), '\\uFEFF','') = '\\\\N' "
-        f"THEN '' ELSE replace(trim(row.`{col}`), '\\uFEFF','') END) <> ''"
-        for col in key_cols
-    )
+    key_preds = " AND ".join(present_pred(col, sanitized) for col in key_cols)
 
     setters = []
     for prop, spec in mappings.items():
         if prop in key_fields:
-            setters.append(f"n.`{prop}` = {type_cast('row.' + spec['column'], spec)}")
+            setters.append(f"n.`{prop}` = {type_cast('row.' + spec['column'], spec, sanitized)}")
         else:
-            setters.append(f"n.`{prop}` = {nullable_cast('row.' + spec['column'], spec)}")
+            setters.append(f"n.`{prop}` = {nullable_cast('row.' + spec['column'], spec, sanitized)}")
     setters += [
         "n.source_system = $source_system",
         "n.ingest_batch  = $ingest_batch",
@@ -170,7 +497,7 @@ def build_node_load_body(node_spec) -> str:
     )
     return body
 
-def build_rel_load_body(rel_spec) -> str:
+def build_rel_load_body(rel_spec, sanitized: bool = False) -> str:
     rtype = rel_spec["type"]
     direction = rel_spec.get("direction", "OUT").upper()
     from_spec = rel_spec["from"]
@@ -185,7 +512,7 @@ def build_rel_load_body(rel_spec) -> str:
                 src_col, target_prop = k.split(":")
             else:
                 src_col, target_prop = k, k
-            parts.append(f"`{target_prop}`: toInteger(replace(trim(row.`{src_col}`), '\\uFEFF',''))")
+            parts.append(f"`{target_prop}`: {int_col(src_col, sanitized)}")
         return f"(x_{role}:`{label}` {{ {', '.join(parts)} }})"
 
     required_cols = []
@@ -195,16 +522,10 @@ def build_rel_load_body(rel_spec) -> str:
     merge_rel_props = ""
     linkid_guard = ""
     if "linkid" in props:
-        linkid_guard = (
-          " AND (CASE WHEN replace(trim(row.`linkid`), '\\uFEFF','') = '\\\\N' "
-          "THEN '' ELSE replace(trim(row.`linkid`), '\\uFEFF','') END) <> ''"
-        )
-        merge_rel_props = " { linkid: toInteger(replace(trim(row.`linkid`), '\\uFEFF','')) }"
+        linkid_guard = " AND " + present_pred("linkid", sanitized)
+        merge_rel_props = f" {{ linkid: {int_col('linkid', sanitized)} }}"
 
-    key_preds = " AND ".join(
-        [f"(CASE WHEN replace(trim(row.`{col}`), '\\uFEFF','') = '\\\\N' THEN '' ELSE replace(trim(row.`{col}`), '\\uFEFF','') END) <> ''"
-         for col in required_cols]
-    ) + linkid_guard
+    key_preds = " AND ".join(present_pred(col, sanitized) for col in required_cols) + linkid_guard
 
     if direction == "OUT":
         pattern = f"(x_from)-[r:`{rtype}`{merge_rel_props}]->(x_to)"
@@ -213,7 +534,7 @@ def build_rel_load_body(rel_spec) -> str:
 
     setters = []
     for prop, spec in props.items():
-        setters.append(f"r.`{prop}` = {nullable_cast('row.' + spec['column'], spec)}")
+        setters.append(f"r.`{prop}` = {nullable_cast('row.' + spec['column'], spec, sanitized)}")
     setters += [
         "r.source_system = $source_system",
         "r.ingest_batch  = $ingest_batch",
@@ -230,32 +551,107 @@ def build_rel_load_body(rel_spec) -> str:
 
 # ---------- Compose full LOAD CSV with proper batching ----------
 
-def load_csv_batched(url_param: str, body: str, rows: int) -> str:
+# Server versions that understand the newer CALL { } IN TRANSACTIONS options
+CONCURRENT_TXNS_SINCE = (5, 21)   # IN n CONCURRENT TRANSACTIONS
+ON_ERROR_RETRY_SINCE  = (2025, 3) # ON ERROR RETRY
+
+def server_version(neo) -> Tuple[int, int]:
+    """(major, minor) of the Neo4j kernel, e.g. (5, 27) or (2025, 4); (0, 0) if unknown."""
+    try:
+        rows = neo.run("CALL dbms.components() YIELD name, versions "
+                       "WHERE name = 'Neo4j Kernel' RETURN versions[0] AS v")
+    except Exception:
+        return (0, 0)
+    m = re.match(r"(\d+)\.(\d+)", rows[0]["v"]) if rows and rows[0]["v"] else None
+    return (int(m.group(1)), int(m.group(2))) if m else (0, 0)
+
+def load_csv_batched(url_param: str, body: str, rows: int,
+                     concurrent_txns: int = 1, retry: bool = False) -> str:
     # Use plain strings around braces; only interpolate `rows`
+    txns = f" IN {concurrent_txns} CONCURRENT TRANSACTIONS" if concurrent_txns > 1 else " IN TRANSACTIONS"
+    on_error = " ON ERROR RETRY FOR 30 SECONDS THEN FAIL" if retry else ""
     return (
         "LOAD CSV WITH HEADERS FROM $" + url_param + " AS row\n"
         "CALL (row) {\n"
         "  " + body.replace("\n", "\n  ") + "\n"
         "}"
-        f" IN TRANSACTIONS OF {rows} ROWS"
+        f"{txns} OF {rows} ROWS{on_error}"
     )
 
 def promote_named_edges(neo, mapping):
     derived = mapping.get("derived_relationships", {}).get("promote_named_edges")
     if not derived:
         return
+    # one UNWIND statement per target type; all linkids for that type go in $rows
+    by_type: Dict[str, List[Dict[str, int]]] = {}
     for m in derived["map"]:
-        lid = int(m["linkid"])
-        rtype = m["type"]
-        cypher = (
-            "MATCH (a:synset)-[r:SYNSET {linkid:$lid}]->(b:synset)\n"
+        by_type.setdefault(m["type"], []).append({"lid": int(m["linkid"])})
+    stmts, params = [], []
+    for rtype, rows in by_type.items():
+        stmts.append(
+            "UNWIND $rows AS row\n"
+            "MATCH (a:synset)-[r:SYNSET {linkid:row.lid}]->(b:synset)\n"
             f"MERGE (a)-[x:`{rtype}`]->(b)\n"
             "ON CREATE SET "
             "  x.source_system = coalesce(r.source_system, 'wordnet'), "
             "  x.ingest_batch  = coalesce(r.ingest_batch,  'derived'), "
             "  x.ingested_at   = datetime()"
         )
-        neo.run_void(cypher, {"lid": lid})
+        params.append({"rows": rows})
+    neo.run_many(stmts, params)
+
+# ---------- Parallel load scheduling ----------
+def build_load_dag(load_order: List[str], nodes, rels) -> Dict[str, List[str]]:
+    """
+    Map each load_order item to the items it must wait for:
+      nodes.*                  -> nothing
+      relationships.*          -> the node loads for its from/to labels
+      derived_relationships.*  -> everything before it in load_order
+    Unknown items have no dependencies (they are just reported and skipped).
+    """
+    node_item_by_label = {}
+    for item in load_order:
+        kind, _, key = item.partition(".")
+        if kind == "nodes" and key in nodes:
+            node_item_by_label[nodes[key]["label"]] = item
+
+    deps: Dict[str, List[str]] = {}
+    for pos, item in enumerate(load_order):
+        kind, _, key = item.partition(".")
+        if kind == "relationships" and key in rels:
+            labels = {rels[key]["from"]["label"], rels[key]["to"]["label"]}
+            deps[item] = [node_item_by_label[l] for l in sorted(labels) if l in node_item_by_label]
+        elif kind == "derived_relationships":
+            deps[item] = list(load_order[:pos])
+        else:
+            deps[item] = []
+    return deps
+
+def run_load_dag(deps: Dict[str, List[str]], run_item, on_done, workers: int) -> None:
+    """
+    Execute items on a thread pool as soon as their dependencies have finished.
+    `on_done(item)` runs on the calling thread before dependents are released,
+    so it may prompt or run follow-up cleanup safely.
+    """
+    pending = dict(deps)
+    done = set()
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        while pending or running:
+            # submit at most `workers` at a time, in load_order, so workers=1 keeps the original sequence
+            for item in [i for i, d in pending.items() if all(x in done for x in d)]:
+                if len(running) >= max(1, workers):
+                    break
+                del pending[item]
+                running[ex.submit(run_item, item)] = item
+            if not running:
+                raise RuntimeError(f"load_order has unsatisfiable dependencies: {sorted(pending)}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                item = running.pop(fut)
+                fut.result()
+                on_done(item)
+                done.add(item)
 
 # ---------- DB-side preview & cleanup ----------
 def list_bad_synset_rels(neo, limit: int = 50) -> Dict[str, Any]:
@@ -278,27 +674,27 @@ def list_bad_synset_rels(neo, limit: int = 50) -> Dict[str, Any]:
         )
     return {"total": total, "sample": sample}
 
-def clean_bad_synset_rels(neo, chunk: int = 20000, max_loops: int = 1000) -> int:
+def clean_bad_synset_rels(neo, chunk: int = 50000, max_loops: int = 1000) -> int:
     """
-    Delete :SYNSET rels with NULL linkid in small batches to avoid memory/timeouts.
-    Returns total deleted.
+    Delete :SYNSET rels with NULL linkid in batches to avoid memory/timeouts.
+    All batches share one session. Returns total deleted.
     """
     total = 0
-    for _ in range(max_loops):
-        rows = neo.run(
-            """
-            MATCH ()-[r:SYNSET]->()
-            WHERE r.linkid IS NULL
-            WITH r LIMIT $chunk
-            DELETE r
-            RETURN count(*) AS c
-            """,
-            {"chunk": chunk},
-        )
-        c = rows[0]["c"] if rows else 0
-        total += c
-        if c == 0:
-            break
+    with neo.session() as session:
+        for _ in range(max_loops):
+            c = session.execute_write(lambda tx: tx.run(
+                """
+                MATCH ()-[r:SYNSET]->()
+                WHERE r.linkid IS NULL
+                WITH r LIMIT $chunk
+                DELETE r
+                RETURN count(*) AS c
+                """,
+                {"chunk": chunk},
+            ).single()["c"])
+            total += c
+            if c == 0:
+                break
     return total
 
 def preview_and_maybe_clean(neo, auto_yes: bool = False, preview_limit: int = 50):
@@ -315,24 +711,37 @@ def preview_and_maybe_clean(neo, auto_yes: bool = False, preview_limit: int = 50
             f"--> TO ({row['to_pos']} {row['to_id']}) \"{row['to_def']}\""
         )
     if auto_yes:
-        deleted = clean_bad_synset_rels(neo, chunk=20000)
+        deleted = clean_bad_synset_rels(neo)
         print(f"Deleted {deleted} null-linkid :SYNSET relationships.")
         return
     ans = input("\nDelete ALL null-linkid :SYNSET relationships now? [y/N]: ").strip().lower()
     if ans == "y":
-        deleted = clean_bad_synset_rels(neo, chunk=20000)
+        deleted = clean_bad_synset_rels(neo)
         print(f"Deleted {deleted} null-linkid :SYNSET relationships.")
     else:
         print("Leaving null-linkid :SYNSET relationships intact.")
 
 def main():
     ap = argparse.ArgumentParser(description="Aura Loader for WordNet mapping spec")
-    ap.add_argument("--aura-uri", required=True, help="bolt+s://<host>:7687")
+    ap.add_argument("--aura-uri", help="bolt+s://<host>:7687 (required unless --sanitize-to)")
     ap.add_argument("--user", default="neo4j")
     ap.add_argument("--password", default=os.getenv("NEO4J_PASSWORD"))
+    ap.add_argument("--database", default="neo4j", help="Target database name (default: neo4j)")
+    ap.add_argument("--pool-size", type=int, default=64,
+                    help="Max Bolt connections in the driver pool (default: 64)")
+    ap.add_argument("--conn-timeout", type=float, default=30.0,
+                    help="Seconds to wait when opening a Bolt connection (default: 30)")
     ap.add_argument("--mapping", required=True, help="Path to mapping JSON")
     ap.add_argument("--manifest", required=True, help="Path to manifest.json (with sha256 & rows)")
     ap.add_argument("--base-url", required=True, help="Base HTTPS URL where CSVs are hosted")
+    ap.add_argument("--local-mirror", default=None,
+                    help="Directory holding local copies of the CSVs (matched by basename); preflight reads these "
+                         "instead of downloading. LOAD CSV still uses --base-url")
+    ap.add_argument("--sanitize-to", default=None, metavar="DIR",
+                    help="Write BOM/'\\N'-free copies of every source into DIR and exit. Publish those "
+                         "(and rebuild their manifest), then load them with --sanitized")
+    ap.add_argument("--sanitized", action="store_true",
+                    help="Sources were produced by --sanitize-to; skip server-side BOM/'\\N' scrubbing in Cypher")
     ap.add_argument("--batch-id", default=None, help="Ingest batch id; default = mapping.version + timestamp")
     ap.add_argument("--verify-checksums", action="store_true")
     ap.add_argument("--verify-rowcounts", action="store_true")
@@ -346,8 +755,29 @@ def main():
                     help="Max rows to show in the null-linkid preview (default: 50)")
     ap.add_argument("--batch-rows", type=int, default=10000,
                     help="Rows per transaction for LOAD CSV batching (Neo4j 5: IN TRANSACTIONS)")
+    ap.add_argument("--concurrent-txns", type=int, default=4,
+                    help="Batches committed in parallel per LOAD CSV (IN n CONCURRENT TRANSACTIONS, Neo4j 5.21+; "
+                         "relationship loads only with ON ERROR RETRY, 2025.03+; default: 4; 1 = serial)")
+    ap.add_argument("--preflight-workers", type=int, default=8,
+                    help="Sources verified concurrently during preflight (default: 8)")
+    ap.add_argument("--ingest-workers", type=int, default=4,
+                    help="Independent node/relationship loads run concurrently (default: 4; 1 = strictly load_order)")
+    ap.add_argument("--no-checksum-cache", action="store_true",
+                    help=f"Always re-hash sources instead of trusting {CHECKSUM_CACHE_PATH} when ETag/Last-Modified match")
     args = ap.parse_args()
 
+    if args.sanitize_to:
+        mapping = read_json(args.mapping)
+        for src in mapping.get("sources", []):
+            if args.local_mirror:
+                url = os.path.join(args.local_mirror, os.path.basename(src["path"]))
+            else:
+                url = to_url(args.base_url, src["path"])
+            print(f"Sanitized {src['name']} -> {sanitize_csv(url, args.sanitize_to)}")
+        return
+
+    if not args.aura_uri:
+        ap.error("--aura-uri is required")
     if not args.password:
         print("ERROR: Provide --password or set NEO4J_PASSWORD env var.", file=sys.stderr)
         sys.exit(2)
@@ -356,7 +786,12 @@ def main():
     mapping = read_json(args.mapping)
     manifest = read_json(args.manifest)
 
-    mani_index = { f["name"]: f for f in manifest.get("files", []) }
+    # index by name and by basename of path, since mapping sources are matched on basename
+    mani_index = {}
+    for f in manifest.get("files", []):
+        mani_index[f["name"]] = f
+        if "path" in f:
+            mani_index[os.path.basename(f["path"])] = f
 
     for s in mapping.get("sources", []):
         base = os.path.basename(s["path"])
@@ -369,44 +804,64 @@ def main():
         version = mapping.get("version", "v")
         args.batch_id = f"{version}-{int(time.time())}"
 
-    neo = Neo(args.aura_uri, args.user, args.password)
+    neo = Neo(args.aura_uri, args.user, args.password,
+              pool_size=args.pool_size, conn_timeout=args.conn_timeout, database=args.database)
 
     # constraints/indexes
-    for stmt in build_constraint_cypher(mapping.get("runtime", {}).get("indexes", [])):
-        neo.run_void(stmt)
+    neo.run_many(build_constraint_cypher(mapping.get("runtime", {}).get("indexes", [])))
 
     # preflight
     if args.verify_checksums or args.verify_rowcounts or args.strict_missing_linkid:
         print("Preflight: verifying sources")
+        flags = {
+            "verify_checksums": args.verify_checksums,
+            "verify_rowcounts": args.verify_rowcounts,
+            "strict_missing_linkid": args.strict_missing_linkid,
+            "checksum_cache": not args.no_checksum_cache,
+        }
+        by_name = {}
+        jobs = []
         for src in mapping.get("sources", []):
-            url = to_url(args.base_url, src["path"])
-            name = src["name"]
-            print(f"  {name}: {url}")
-            if args.verify_checksums and src.get("checksum_sha256"):
-                h = sha256_of_url(url)
-                if h != src["checksum_sha256"]:
-                    print(f"    ERROR checksum mismatch (got {h}, expected {src['checksum_sha256']})", file=sys.stderr)
-                    sys.exit(3)
-                print("    checksum OK")
-            if args.verify_rowcounts and src.get("rows") is not None:
-                n = count_rows_of_url(url)
-                if n != int(src["rows"]):
-                    print(f"    ERROR rowcount mismatch (got {n}, expected {src['rows']})", file=sys.stderr)
-                    sys.exit(4)
-                print("    rowcount OK")
-            if name == "semlinkref":
-                try:
-                    missing = count_missing_col_in_csv(url, "linkid")
-                except Exception as e:
-                    print(f"    WARNING: could not inspect linkid in semlinkref.csv: {e}")
-                else:
-                    if missing > 0:
-                        msg = f"    WARNING: semlinkref.csv has {missing} rows with empty linkid"
+            by_name[src["name"]] = src
+            if args.local_mirror:
+                jobs.append((src, os.path.join(args.local_mirror, os.path.basename(src["path"]))))
+            else:
+                jobs.append((src, to_url(args.base_url, src["path"])))
+
+        with ThreadPoolExecutor(max_workers=max(1, args.preflight_workers)) as ex:
+            futures = [ex.submit(_preflight_one, src, url, flags) for src, url in jobs]
+
+            def fail(msg: str, code: int):
+                print(msg, file=sys.stderr)
+                sys.exit(code)
+
+            try:
+                for fut in as_completed(futures):
+                    res = fut.result()
+                    src = by_name[res["name"]]
+                    print(f"  {res['name']}: {res['url']}")
+                    if res["sha"] is not None:
+                        if res["sha"] != src["checksum_sha256"]:
+                            fail(f"    ERROR checksum mismatch (got {res['sha']}, expected {src['checksum_sha256']})", 3)
+                        print("    checksum OK (cached)" if res["sha_cached"] else "    checksum OK")
+                    if res["rows"] is not None:
+                        if res["rows"] != int(src["rows"]):
+                            fail(f"    ERROR rowcount mismatch (got {res['rows']}, expected {src['rows']})", 4)
+                        print("    rowcount OK")
+                    if res["error"] is not None:
+                        print(f"    WARNING: could not inspect linkid in semlinkref.csv: {res['error']}")
+                    elif res["missing_linkid"]:
+                        msg = f"    WARNING: semlinkref.csv has {res['missing_linkid']} rows with empty linkid"
                         if args.strict_missing_linkid:
-                            print(msg, file=sys.stderr)
-                            sys.exit(6)
+                            fail(msg, 6)
                         else:
                             print(msg)
+            except BaseException:
+                # stop the other downloads now instead of letting the executor wait them out
+                abort_streams.set()
+                for f in futures:
+                    f.cancel()
+                raise
 
     params_common = {
         "source_system": mapping.get("ingest_batch", {}).get("attach_properties", {}).get("source_system", "wordnet"),
@@ -417,36 +872,60 @@ def main():
     nodes = mapping.get("nodes", {})
     rels  = mapping.get("relationships", {})
 
+    sources_by_name = {s["name"]: s for s in mapping.get("sources", [])}
+
     def url_for_source_name(name: str) -> str:
-        src = next((s for s in mapping.get("sources", []) if s["name"] == name), None)
+        src = sources_by_name.get(name)
         if not src:
             raise RuntimeError(f"Source '{name}' not found in mapping.sources")
         return to_url(args.base_url, src["path"])
 
+    version = server_version(neo)
+    concurrent_txns = args.concurrent_txns
+    if concurrent_txns > 1 and version < CONCURRENT_TXNS_SINCE:
+        shown = f"{version[0]}.{version[1]}" if version != (0, 0) else "unknown"
+        print(f"Server version {shown} lacks CONCURRENT TRANSACTIONS; committing batches serially")
+        concurrent_txns = 1
+    txn_retry = version >= ON_ERROR_RETRY_SINCE
+    # Relationship MERGEs lock shared endpoint nodes, so concurrent batches can deadlock;
+    # without ON ERROR RETRY one deadlock fails the whole file. Only node loads (disjoint
+    # keys) run concurrently then.
+    rel_txns = concurrent_txns if txn_retry else 1
+    if rel_txns < concurrent_txns:
+        print("Server lacks ON ERROR RETRY; relationship loads commit batches serially")
+
+    # Cypher depends only on the spec, so build every statement once up front;
+    # retries reuse the same string and a bad spec fails before any load starts.
+    compiled: Dict[str, Dict[str, str]] = {}
     for item in load_order:
+        kind, _, key = item.partition(".")
+        if kind == "nodes":
+            spec = nodes[key]
+            body = build_node_load_body(spec, args.sanitized)
+            txns = concurrent_txns
+        elif kind == "relationships":
+            spec = rels[key]
+            body = build_rel_load_body(spec, args.sanitized)
+            txns = rel_txns
+        else:
+            continue
+        compiled[item] = {
+            "url": url_for_source_name(spec["source"]),
+            "cypher": load_csv_batched("url", body, args.batch_rows, txns, txn_retry),
+        }
+
+    def load_item(item: str) -> None:
         if item.startswith("nodes."):
             key = item.split(".", 1)[1]
-            spec = nodes[key]
-            url = url_for_source_name(spec["source"])
-            body = build_node_load_body(spec)
-            cypher = load_csv_batched("url", body, args.batch_rows)
-            print(f"Loading nodes {key} from {url}")
-            neo.run_void(cypher, {**params_common, "url": url})
+            c = compiled[item]
+            print(f"Loading nodes {key} from {c['url']}")
+            neo.run_load(c["cypher"], {**params_common, "url": c["url"]})
 
         elif item.startswith("relationships."):
             key = item.split(".", 1)[1]
-            spec = rels[key]
-            url = url_for_source_name(spec["source"])
-            body = build_rel_load_body(spec)
-            cypher = load_csv_batched("url", body, args.batch_rows)
-            print(f"Loading rels {key} from {url}")
-            neo.run_void(cypher, {**params_common, "url": url})
-
-            if key == "semantic_SYNSET":
-                if args.auto_yes_clean_null_linkid:
-                    preview_and_maybe_clean(neo, auto_yes=True, preview_limit=args.preview_limit)
-                elif args.preview_null_linkid:
-                    preview_and_maybe_clean(neo, auto_yes=False, preview_limit=args.preview_limit)
+            c = compiled[item]
+            print(f"Loading rels {key} from {c['url']}")
+            neo.run_load(c["cypher"], {**params_common, "url": c["url"]})
 
         elif item.startswith("derived_relationships."):
             print("Promoting named edges...")
@@ -454,19 +933,28 @@ def main():
         else:
             print(f"Skipping unknown load_order item: {item}")
 
+    def after_item(item: str) -> None:
+        if item == "relationships.semantic_SYNSET":
+            if args.auto_yes_clean_null_linkid:
+                preview_and_maybe_clean(neo, auto_yes=True, preview_limit=args.preview_limit)
+            elif args.preview_null_linkid:
+                preview_and_maybe_clean(neo, auto_yes=False, preview_limit=args.preview_limit)
+
+    run_load_dag(build_load_dag(load_order, nodes, rels), load_item, after_item, args.ingest_workers)
+
     # validations
     for assertion in mapping.get("validation", {}).get("graph_assertions", []):
         cypher = assertion["cypher"]
         rows = neo.run(cypher)
-        if rows and "ok" in rows[0]:
+        if rows and "ok" in rows[0].keys():
             ok = rows[0]["ok"]
             if ok is True or ok == 1:
                 print(f"Validation OK: {cypher}")
             else:
-                print(f"Validation FAILED: {cypher} -> {rows}", file=sys.stderr)
+                print(f"Validation FAILED: {cypher} -> {[r.data() for r in rows]}", file=sys.stderr)
                 sys.exit(5)
         else:
-            print(f"Validation result: {rows}")
+            print(f"Validation result: {[r.data() for r in rows]}")
 
     neo.close()
     print("Ingest complete. Batch:", args.batch_id)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
-import os, json, hashlib, argparse, csv
-from datetime import datetime, timezone
+import os, argparse, csv, io
+
+from _manifest_common import build_manifest, dumps, ensure_dirs, write_atomic
 
 # --------------------------
 # Config / Defaults
@@ -16,70 +17,22 @@ REQUIRED_SOURCES = ["synset.csv", "word.csv", "sense.csv", "semlinkref.csv", "li
 # --------------------------
 # Helpers
 # --------------------------
-def sha256(path, chunk_size=1024*1024):
-    h = hashlib.sha256()
-    with open(path, 'rb') as fh:
-        for chunk in iter(lambda: fh.read(chunk_size), b''):
-            h.update(chunk)
-    return h.hexdigest()
+def parse_header(f):
+    header = next(csv.reader(f), [])
+    return [h.strip().lstrip("\ufeff") for h in header]
 
 def read_header(csv_path):
     try:
         with open(csv_path, "r", encoding="utf-8", newline="") as f:
-            reader = csv.reader(f)
-            header = next(reader, [])
-            return [h.strip().lstrip("\ufeff") for h in header]
+            return parse_header(f)
     except FileNotFoundError:
         return []
 
-def ensure_dirs(base):
-    os.makedirs(os.path.join(base, "manifest"), exist_ok=True)
-    os.makedirs(os.path.join(base, "mappings"), exist_ok=True)
-    os.makedirs(os.path.join(base, "src"), exist_ok=True)
-
-# --------------------------
-# Manifest (preserve exact behavior)
-# --------------------------
-def build_manifest(base):
-    src_dir  = os.path.join(base, "src")
-    mani_dir = os.path.join(base, "manifest")
-    ensure_dirs(base)
-
-    files = sorted(f for f in os.listdir(src_dir) if f.endswith(".csv"))
-    entries = []
-    for f in files:
-        path = os.path.join(src_dir, f)
-        with open(path, "r", encoding="utf-8", errors="ignore") as fh:
-            total = sum(1 for _ in fh)
-        rows = max(0, total - 1)  # exclude header
-        entries.append({"name": f, "sha256": sha256(path), "rows": rows, "format": "csv"})
-
-    manifest = {
-        "dataset": DATASET,
-        "version": VERSION,
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "files": entries
-    }
-
-    mjson = json.dumps(manifest, indent=2, sort_keys=True).encode()
-    with open(os.path.join(mani_dir, "manifest.json"), "wb") as f:
-        f.write(mjson)
-    with open(os.path.join(mani_dir, "manifest.sha256"), "w", encoding="utf-8") as f:
-        f.write(hashlib.sha256(mjson).hexdigest() + " manifest.json\n")
-
-    print(f"✓ Wrote {os.path.join(mani_dir, 'manifest.json')} and manifest.sha256")
-
 # --------------------------
 # Mapping (required shape)
 # --------------------------
-def build_required_mapping(base):
-    src_dir = os.path.join(base, "src")
-
-    # Detect semlinkref column names (either synsetid1/synsetid2 OR synset1id/synset2id)
-    sem_cols = read_header(os.path.join(src_dir, "semlinkref.csv"))
-    syn1 = "synsetid1" if "synsetid1" in sem_cols else ("synset1id" if "synset1id" in sem_cols else "synsetid1")
-    syn2 = "synsetid2" if "synsetid2" in sem_cols else ("synset2id" if "synset2id" in sem_cols else "synsetid2")
-
+def mapping_template(syn1, syn2):
+    """Full mapping dict; only the semlinkref column names vary between datasets."""
     mapping = {
       "schema_version": SCHEMA_VERSION,
       "dataset": DATASET,
@@ -204,10 +157,31 @@ def build_required_mapping(base):
     }
     return mapping
 
+# Every (syn1, syn2) column combination the detection below can produce, serialized once at import
+SEMLINK_COLUMN_PAIRS = [(a, b) for a in ("synsetid1", "synset1id") for b in ("synsetid2", "synset2id")]
+_MAPPING_CACHE = {pair: dumps(mapping_template(*pair)) for pair in SEMLINK_COLUMN_PAIRS}
+
+def build_required_mapping(base, headers=None):
+    """
+    Serialized mapping JSON (bytes) matching the semlinkref header under base/src.
+    headers: {filename: header line} from build_manifest, to avoid reopening the CSV.
+    """
+    src_dir = os.path.join(base, "src")
+
+    # Detect semlinkref column names (either synsetid1/synsetid2 OR synset1id/synset2id)
+    if headers and "semlinkref.csv" in headers:
+        sem_cols = parse_header(io.StringIO(headers["semlinkref.csv"]))
+    else:
+        sem_cols = read_header(os.path.join(src_dir, "semlinkref.csv"))
+    syn1 = "synsetid1" if "synsetid1" in sem_cols else ("synset1id" if "synset1id" in sem_cols else "synsetid1")
+    syn2 = "synsetid2" if "synsetid2" in sem_cols else ("synset2id" if "synset2id" in sem_cols else "synsetid2")
+    return _MAPPING_CACHE[(syn1, syn2)]
+
 def write_mapping(base, mapping_obj, filename=MAPPING_FILENAME):
+    """mapping_obj: pre-serialized bytes (from build_required_mapping) or a dict."""
     path = os.path.join(base, "mappings", filename)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(mapping_obj, f, indent=2)
+    data = mapping_obj if isinstance(mapping_obj, bytes) else dumps(mapping_obj)
+    write_atomic(path, data)
     print(f"✓ Wrote mapping: {path}")
     return path
 
@@ -222,19 +196,21 @@ def main():
                     help="Rebuild mapping even if it exists")
     ap.add_argument("--mapping-name", default=MAPPING_FILENAME,
                     help="Output filename for mapping JSON")
+    ap.add_argument("--rehash", action="store_true",
+                    help="Re-hash every CSV instead of trusting manifest/.cache.json when size and mtime match")
     args = ap.parse_args()
 
     ensure_dirs(args.base)
 
     # 1) Manifest (exact behavior as legacy script)
-    build_manifest(args.base)
+    headers = build_manifest(args.base, DATASET, VERSION, use_cache=not args.rehash)
 
     # 2) Mapping (create or refresh)
     mpath = os.path.join(args.base, "mappings", args.mapping_name)
     if os.path.exists(mpath) and not args.force_mapping:
         print(f"• Mapping already exists: {mpath} (use --force-mapping to regenerate)")
     else:
-        mapping = build_required_mapping(args.base)
+        mapping = build_required_mapping(args.base, headers)
         write_mapping(args.base, mapping, filename=args.mapping_name)
 
 if __name__ == "__main__":
@@ -1,12 +1,51 @@
 # USAGE: mysqlsh --py --host 0.tcp.ngrok.io --port 10168 -u root -p --file extractDB-CSV.py
 
+import csv
+import errno
+import io
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-DB  = 'wordnet30'
-OUT = '/Users/ken/mira/KGPipeline/stage/wordnet-3.0/src_h'
+DB      = 'wordnet30'
+OUT     = '/Users/ken/mira/KGPipeline/stage/wordnet-3.0/src_h'
+# 1 = export inline on the main thread (the original path). >1 is an experimental
+# opt-in: MySQL Shell doesn't document its Python bridge / global session as thread-safe.
+WORKERS = 1
 
 os.makedirs(OUT, exist_ok=True)
 
+SENDFILE_UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK, errno.EOPNOTSUPP}
+
+def append_file(src_path, dst_path):
+    """Append src to dst in the kernel via sendfile; fall back to a buffered copy
+    where sendfile can't copy between regular files (macOS only supports sockets)."""
+    # not 'ab': Linux sendfile(2) rejects an O_APPEND output fd with EINVAL
+    with open(dst_path, 'r+b') as outfh, open(src_path, 'rb') as infh:
+        outfh.seek(0, os.SEEK_END)
+        # explicit offset: only Linux accepts offset=None
+        off = 0
+        try:
+            while (n := os.sendfile(outfh.fileno(), infh.fileno(), off, 1 << 24)):
+                off += n
+        except (AttributeError, OSError) as e:
+            if isinstance(e, OSError) and e.errno not in SENDFILE_UNSUPPORTED:
+                raise
+            # resume the copy where sendfile stopped
+            infh.seek(off)
+            outfh.seek(0, os.SEEK_END)
+            shutil.copyfileobj(infh, outfh, 1024 * 1024)
+
+def count_lines(path):
+    """Newline-terminated lines (plus an unterminated tail) — same rule as the manifest rows."""
+    n = 0
+    last = b''
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            n += chunk.count(b'\n')
+            last = chunk[-1:]
+    return n + (1 if last and last != b'\n' else 0)
+
 # `session` is provided by MySQL Shell (Python mode)
 # NOTE: use ? placeholders (not %s) with run_sql()
 tables = session.run_sql(
@@ -19,6 +58,8 @@ tables = session.run_sql(
     [DB]
 ).fetch_all()
 
+# Column lists go through the shared `session`, so fetch them serially up front
+columns = {}
 for (table_name,) in tables:
     cols = session.run_sql(
         """
@@ -29,14 +70,17 @@ for (table_name,) in tables:
         """,
         [DB, table_name]
     ).fetch_all()
-    colnames = [c[0] for c in cols]
+    columns[table_name] = [c[0] for c in cols]
 
+def export_one(table_name, colnames):
     final_path = f"{OUT}/{table_name}.csv"
     tmp_path   = f"{OUT}/.{table_name}.data.csv"
 
-    # 1) write header
-    with open(final_path, 'w', encoding='utf-8', newline='') as fh:
-        fh.write(','.join(f'"{c}"' for c in colnames) + '\n')
+    # 1) write header (csv.writer escapes any quotes/commas in column names)
+    buf = io.StringIO()
+    csv.writer(buf, quoting=csv.QUOTE_ALL, lineterminator='\n').writerow(colnames)
+    with open(final_path, 'wb') as fh:
+        fh.write(buf.getvalue().encode('utf-8'))
 
     # 2) export data (no header) to temp file
     util.export_table(f"{DB}.{table_name}", tmp_path, {
@@ -45,15 +89,40 @@ for (table_name,) in tables:
         # You can also add: "fieldsTerminatedBy": ",", "linesTerminatedBy": "\n"
     })
 
-    # 3) append data then remove temp
-    with open(final_path, 'a', encoding='utf-8', newline='') as outfh, \
-         open(tmp_path, 'r', encoding='utf-8', newline='') as infh:
-        for line in infh:
-            outfh.write(line)
+    # 3) row count from the export itself (no extra COUNT(*) round-trip), append data, remove temp
+    rowcount = count_lines(tmp_path)
+    append_file(tmp_path, final_path)
     os.remove(tmp_path)
+    return final_path, rowcount
+
+failed = []
+
+def report(table_name, outcome):
+    if isinstance(outcome, Exception):
+        failed.append(table_name)
+        print(f"FAILED {table_name}: {outcome}")
+    else:
+        final_path, rowcount = outcome
+        print(f"Wrote {final_path} ({rowcount} rows)")
+
+def run_export(table_name, colnames):
+    try:
+        return export_one(table_name, colnames)
+    except Exception as e:
+        return e
 
-    # optional: row count report
-    rowcount = session.run_sql(f"SELECT COUNT(*) FROM `{DB}`.`{table_name}`").fetch_one()[0]
-    print(f"Wrote {final_path} ({rowcount} rows)")
+if WORKERS > 1:
+    # opt-in: overlap the network + disk bound exports, then report in table order
+    with ThreadPoolExecutor(max_workers=WORKERS) as ex:
+        futures = {ex.submit(run_export, t, cols): t for t, cols in columns.items()}
+        results = {futures[f]: f.result() for f in as_completed(futures)}
+    for table_name in columns:
+        report(table_name, results[table_name])
+else:
+    # default: same thread as the mysqlsh session, one table at a time
+    for table_name, colnames in columns.items():
+        report(table_name, run_export(table_name, colnames))
 
+if failed:
+    raise SystemExit(f"{len(failed)} table(s) failed: {', '.join(failed)}")
 print("All tables exported with headers.")